@@ -0,0 +1,88 @@
+"""
+Per-symbol on-disk cache of daily bars, one Parquet file per symbol.
+
+The file also records `covered_from`, the start date of the range the bars
+were fetched for, so a later request can tell whether its start is covered
+even when that date was a weekend / holiday.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+import pandas as pd
+
+try:
+    import portalocker
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError as e:
+    raise ImportError(f"Missing dependency: {e}. Please install pyarrow and portalocker.")
+
+
+CACHE_DIR = os.environ.get("BAR_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"))
+LOCK_TIMEOUT = 10  # seconds
+
+_META_KEY = b"covered_from"
+
+
+def _path(symbol: str) -> str:
+    return os.path.join(CACHE_DIR, f"{symbol}.parquet")
+
+
+@contextmanager
+def lock(symbol: str) -> Iterator[None]:
+    """
+    Serialize read-merge-write per symbol across workers.
+    Best-effort like load/store: writes are atomic anyway, so on timeout or
+    an unwritable CACHE_DIR we proceed unlocked.
+    """
+    locker = portalocker.Lock(_path(symbol) + ".lock", timeout=LOCK_TIMEOUT)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        locker.acquire()
+    except (portalocker.exceptions.LockException, OSError) as e:
+        print(f"[BarCache Error] lock symbol={symbol} err={e}")
+        locker = None
+
+    try:
+        yield
+    finally:
+        if locker is not None:
+            locker.release()
+
+
+def load(symbol: str) -> Tuple[pd.DataFrame, str]:
+    """
+    Return (bars indexed by Date, covered_from "YYYY-MM-DD").
+    Missing or unreadable cache -> (empty frame, "").
+    """
+    path = _path(symbol)
+    if not os.path.exists(path):
+        return pd.DataFrame(), ""
+
+    try:
+        table = pq.read_table(path)
+    except Exception as e:
+        print(f"[BarCache Error] read symbol={symbol} err={e}")
+        return pd.DataFrame(), ""
+
+    meta = table.schema.metadata or {}
+    return table.to_pandas(), meta.get(_META_KEY, b"").decode()
+
+
+def store(symbol: str, bars: pd.DataFrame, covered_from: str) -> None:
+    path = _path(symbol)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(bars)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _META_KEY: covered_from.encode()})
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)  # readers never see a partial file
+    except Exception as e:
+        print(f"[BarCache Error] write symbol={symbol} err={e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,119 @@
+"""
+Single-pass technical indicator kernel.
+
+Streams Close once and keeps rolling sums incrementally, so every indicator
+is O(N) regardless of window size. Semantics match the pandas path in
+stock_service.feature_engineering (min_periods=1 for MA / volatility,
+Wilder RSI with min_periods=14).
+
+The float64 specialization is compiled at import so the first request
+doesn't pay the JIT. With cache=True the machine code lands in
+__pycache__ (or NUMBA_CACHE_DIR); running `python -c "import stock_service"`
+while building an image bakes it in. Set WARMUP_NUMBA=0 to skip.
+"""
+from __future__ import annotations
+
+import os
+from typing import Tuple
+
+import numpy as np
+
+from _njit import NUMBA_AVAILABLE, njit
+
+
+# error_model="numpy": a zero Close (possible with qfq prices) gives inf/nan
+# like pct_change, instead of raising ZeroDivisionError
+@njit(cache=True, error_model="numpy")
+def compute_features(close: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns (ma10, ma50, daily_return, vol20, rsi14) as float64, same length as close.
+    Reads are cast with np.float64() so other input dtypes still compute in float64.
+    """
+    n = close.shape[0]
+    ma10 = np.empty(n, dtype=np.float64)
+    ma50 = np.empty(n, dtype=np.float64)
+    ret = np.empty(n, dtype=np.float64)
+    vol20 = np.empty(n, dtype=np.float64)
+    rsi = np.empty(n, dtype=np.float64)
+
+    sum10 = 0.0
+    sum50 = 0.0
+
+    # rolling 20-day window over finite returns
+    r_sum = 0.0
+    r_sq = 0.0
+    r_cnt = 0
+
+    avg_gain = 0.0
+    avg_loss = 0.0
+
+    for i in range(n):
+        c = np.float64(close[i])
+
+        # Moving Averages
+        sum10 += c
+        if i >= 10:
+            sum10 -= np.float64(close[i - 10])
+        ma10[i] = sum10 / min(i + 1, 10)
+
+        sum50 += c
+        if i >= 50:
+            sum50 -= np.float64(close[i - 50])
+        ma50[i] = sum50 / min(i + 1, 50)
+
+        # Daily return
+        if i == 0:
+            ret[i] = np.nan
+        else:
+            ret[i] = c / np.float64(close[i - 1]) - 1.0
+
+        # Volatility (20-day sample std of returns)
+        r = ret[i]
+        if np.isfinite(r):
+            r_sum += r
+            r_sq += r * r
+            r_cnt += 1
+        if i >= 20:
+            r_old = ret[i - 20]
+            if np.isfinite(r_old):
+                r_sum -= r_old
+                r_sq -= r_old * r_old
+                r_cnt -= 1
+        if r_cnt >= 2:
+            var = (r_sq - r_sum * r_sum / r_cnt) / (r_cnt - 1)
+            vol20[i] = np.sqrt(var) if var > 0.0 else 0.0
+        else:
+            vol20[i] = np.nan
+
+        # RSI (14-day), Wilder's recurrence
+        gain = 0.0
+        loss = 0.0
+        if i > 0:
+            d = c - np.float64(close[i - 1])
+            if d > 0:
+                gain = d
+            elif d < 0:
+                loss = -d
+        if i == 0:
+            avg_gain = gain
+            avg_loss = loss
+        else:
+            avg_gain = avg_gain * (13.0 / 14.0) + gain / 14.0
+            avg_loss = avg_loss * (13.0 / 14.0) + loss / 14.0
+
+        if i < 13:
+            rsi[i] = np.nan
+        elif avg_loss == 0.0:
+            rsi[i] = 100.0
+        else:
+            rsi[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    return ma10, ma50, ret, vol20, rsi
+
+
+def _warmup() -> None:
+    compute_features(np.arange(1, 61, dtype=np.float64))
+
+
+if NUMBA_AVAILABLE and os.environ.get("WARMUP_NUMBA", "1") == "1":
+    _warmup()
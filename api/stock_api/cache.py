@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import orjson
+
+try:
+    import redis
+except ImportError:
+    # Optional: without redis the cache is simply off
+    redis = None
+
+
+# =========================
+# Config
+# =========================
+
+# Unset / empty -> cache disabled, e.g. REDIS_URL=redis://localhost:6379/0
+REDIS_URL = os.environ.get("REDIS_URL", "")
+
+TTL_TODAY_SECONDS = 60              # range ends today -> latest bar still moving
+TTL_HISTORICAL_SECONDS = 24 * 3600  # closed range -> bars are immutable
+
+KEY_PREFIX = "stock:"  # namespace inside a possibly shared Redis db
+
+ERROR_BACKOFF_SECONDS = 30  # after a Redis error, skip Redis for this long
+
+_client = None
+if REDIS_URL:
+    if redis is None:
+        print("[Redis Error] REDIS_URL is set but redis is not installed, cache disabled")
+    else:
+        _client = redis.Redis.from_url(
+            REDIS_URL,
+            decode_responses=False,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5,
+        )
+
+_down_until = 0.0  # time.monotonic() until which Redis is skipped
+
+
+# =========================
+# Helpers
+# =========================
+
+def make_key(symbol: str, start_date: str, end_date: str) -> str:
+    return f"{KEY_PREFIX}{symbol}:{start_date}:{end_date}"
+
+
+def _available() -> bool:
+    return _client is not None and time.monotonic() >= _down_until
+
+
+def _mark_down(op: str, key: str, e: Exception) -> None:
+    global _down_until
+    _down_until = time.monotonic() + ERROR_BACKOFF_SECONDS
+    print(f"[Redis Error] {op} key={key} err={e}, skipping Redis for {ERROR_BACKOFF_SECONDS}s")
+
+
+def ttl_for(end_date: str) -> int:
+    """
+    Short TTL when the range ends today, long TTL for purely historical ranges.
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    return TTL_TODAY_SECONDS if end_date >= today else TTL_HISTORICAL_SECONDS
+
+
+# =========================
+# Get / Set
+# =========================
+
+def get_json(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the cached payload, or None on miss / Redis disabled or unavailable.
+    """
+    if not _available():
+        return None
+
+    try:
+        raw = _client.get(key)
+    except redis.RedisError as e:
+        # Cache is best-effort, never break the request
+        _mark_down("get", key, e)
+        return None
+
+    if raw is None:
+        return None
+
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError as e:
+        # corrupt / foreign value -> treat as miss, next set_json overwrites it
+        print(f"[Redis Error] decode key={key} err={e}")
+        return None
+
+
+def set_json(key: str, value: Dict[str, Any], ttl: int) -> None:
+    if not _available():
+        return
+
+    try:
+        _client.setex(key, ttl, orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY))
+    except redis.RedisError as e:
+        _mark_down("set", key, e)
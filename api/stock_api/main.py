@@ -1,8 +1,39 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import anyio
 from fastapi import FastAPI, Query
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
-from stock_service import get_stock_data_with_features
 
-app = FastAPI(title="China Stock Data API", version="1.0.0")
+import cache
+from stock_service import (
+    HTTP_POOL_SIZE,
+    IntervalType,
+    _calc_date_range,
+    _normalize_stock_symbol,
+    get_stock_data_with_features,
+)
+
+
+# Stock handlers return ORJSONResponse instances directly: a plain dict would
+# first go through FastAPI's jsonable_encoder, which costs far more than orjson.
+app = FastAPI(title="China Stock Data API", version="1.0.0", default_response_class=ORJSONResponse)
+# repetitive numeric JSON compresses well; tiny bodies (/health) are left as-is
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
+# Worker threads for blocking fetches, sized to the AkShare HTTP pool.
+# asyncio.to_thread's default executor only has min(32, cpu + 4) threads.
+# Created lazily: it must be bound to the running event loop.
+_fetch_limiter: Optional[anyio.CapacityLimiter] = None
+
+# Upper bound on concurrent fetches from all batch requests together (AkShare
+# rate limits). Batches share _fetch_limiter, so this keeps 3/4 of its threads
+# free for single-stock requests.
+_BATCH_CONCURRENCY = HTTP_POOL_SIZE // 4
+_batch_semaphore = asyncio.Semaphore(_BATCH_CONCURRENCY)
 
 
 class StockRequest(BaseModel):
@@ -10,16 +41,73 @@ class StockRequest(BaseModel):
     interval: str | int = Field("365d", examples=["30d", "6m", "1y", 365])
 
 
+class BatchStockRequest(BaseModel):
+    stock_codes: List[str] = Field(..., min_length=1, max_length=100, examples=[["600519", "000001"]])
+    interval: str | int = Field("365d", examples=["30d", "6m", "1y", 365])
+
+
+def _cached_stock_data(stock_code: str, interval: IntervalType) -> Dict[str, Any]:
+    """
+    Redis read-through in front of get_stock_data_with_features.
+    Only successful responses are cached.
+    """
+    start_date, end_date, _ = _calc_date_range(interval)
+    key = cache.make_key(_normalize_stock_symbol(stock_code), start_date, end_date)
+
+    hit = cache.get_json(key)
+    if hit is not None:
+        # key is the normalized symbol, echo back the caller's own code
+        hit["meta"]["stock_code"] = stock_code
+        return hit
+
+    result = get_stock_data_with_features(stock_code=stock_code, interval=interval)
+    if result["success"]:
+        cache.set_json(key, result, cache.ttl_for(end_date))
+    return result
+
+
+async def _run_stock_data(stock_code: str, interval: IntervalType) -> Dict[str, Any]:
+    global _fetch_limiter
+    if _fetch_limiter is None:
+        _fetch_limiter = anyio.CapacityLimiter(HTTP_POOL_SIZE)
+    return await anyio.to_thread.run_sync(_cached_stock_data, stock_code, interval, limiter=_fetch_limiter)
+
+
+async def _bounded_stock_data(stock_code: str, interval: IntervalType) -> Dict[str, Any]:
+    """
+    One batch item; a failure becomes that item's success=False entry
+    instead of failing the whole batch.
+    """
+    try:
+        async with _batch_semaphore:
+            return await _run_stock_data(stock_code, interval)
+    except Exception as e:
+        print(f"[Batch Error] stock_code={stock_code} err={e}")
+        start_date, end_date, interval_norm = _calc_date_range(interval)
+        return {
+            "success": False,
+            "message": f"Error: {e}",
+            "meta": {"stock_code": stock_code, "symbol": _normalize_stock_symbol(stock_code), "start_date": start_date, "end_date": end_date, "interval": interval_norm, "rows": 0},
+            "data": [],
+        }
+
+
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
 @app.get("/stocks/{stock_code}")
-def get_stock(stock_code: str, interval: str = Query("365d", description="e.g. 30d / 6m / 1y / 365")):
-    return get_stock_data_with_features(stock_code=stock_code, interval=interval)
+async def get_stock(stock_code: str, interval: str = Query("365d", description="e.g. 30d / 6m / 1y / 365")):
+    return ORJSONResponse(await _run_stock_data(stock_code, interval))
 
 
 @app.post("/stocks")
-def post_stock(req: StockRequest):
-    return get_stock_data_with_features(stock_code=req.stock_code, interval=req.interval)
+async def post_stock(req: StockRequest):
+    return ORJSONResponse(await _run_stock_data(req.stock_code, req.interval))
+
+
+@app.post("/stocks/batch")
+async def post_stock_batch(req: BatchStockRequest):
+    items = await asyncio.gather(*(_bounded_stock_data(code, req.interval) for code in req.stock_codes))
+    return ORJSONResponse({"items": items})
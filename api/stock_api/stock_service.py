@@ -1,15 +1,25 @@
 from __future__ import annotations
 
 import math
+import re
+import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 
+import _bar_cache
+from _features_njit import compute_features
+from _njit import NUMBA_AVAILABLE
+
 try:
     import akshare as ak
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
 except ImportError as e:
     raise ImportError(f"Missing dependency: {e}. Please install akshare.")
 
@@ -29,10 +39,74 @@ class StockQuery:
     interval: str    # normalized string (e.g. "30d")
 
 
+# Per-worker L1 cache for AkShare fetches. Ranges ending today are bucketed so
+# the still-moving latest bar is re-fetched at most once per bucket.
+_FETCH_CACHE_TODAY_TTL = 60
+
+# AkShare column names -> standardized OHLCV names
+_RENAME_MAP = {
+    "日期": "Date",
+    "开盘": "Open",
+    "最高": "High",
+    "最低": "Low",
+    "收盘": "Close",
+    "成交量": "Volume",
+}
+_REQUIRED = frozenset({"Date", "Open", "High", "Low", "Close", "Volume"})
+_NUMERIC_COLS = ("Open", "High", "Low", "Close", "Volume")
+
+# A-share codes are 6 digits; anything else never reaches AkShare or the disk cache
+_SYMBOL_RE = re.compile(r"\d{6}")
+
+
+# =========================
+# HTTP connection pooling
+# =========================
+
+# One keep-alive pool shared by all worker threads, instead of a fresh
+# TCP/TLS handshake per AkShare call. main.py sizes its fetch threads to match.
+HTTP_POOL_SIZE = 64
+
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=HTTP_POOL_SIZE,
+    pool_maxsize=HTTP_POOL_SIZE,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+
+class _PooledRequests:
+    """
+    Stand-in for the `requests` module inside AkShare: get/post go through
+    _SESSION, anything else (exceptions, ...) falls through to requests.
+    """
+
+    def get(self, url, **kwargs):
+        return _SESSION.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return _SESSION.post(url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+def _install_pooled_session() -> None:
+    hist_globals = ak.stock_zh_a_hist.__globals__
+    if hist_globals.get("requests") is requests:
+        hist_globals["requests"] = _PooledRequests()
+
+
+_install_pooled_session()
+
+
 # =========================
 # Helpers
 # =========================
 
+@lru_cache(maxsize=1024)
 def _normalize_stock_symbol(stock_code: str) -> str:
     """
     Accept: "600519", "600519.SH", "600519.SZ" -> "600519"
@@ -42,11 +116,13 @@ def _normalize_stock_symbol(stock_code: str) -> str:
     return str(stock_code).strip().split(".")[0].strip()
 
 
+@lru_cache(maxsize=64)
 def _parse_interval_to_days(interval: IntervalType, default_days: int = 365) -> int:
     """
     interval:
       - int: treated as days
       - str: "365d", "6m", "1y", "30" (days), case-insensitive
+    Memoized: every IntervalType value is hashable and the result is pure.
     """
     if interval is None:
         return default_days
@@ -93,13 +169,10 @@ def _calc_date_range(interval: IntervalType) -> Tuple[str, str, str]:
 def _sanitize_for_json(obj: Any) -> Any:
     """
     Recursively convert NaN/Inf (numpy or python) to None so strict JSON won't fail.
+    numpy scalars are kept as-is, orjson serializes them natively.
     """
-    # numpy scalar -> python scalar
-    if isinstance(obj, (np.floating, np.integer)):
-        obj = obj.item()
-
-    if isinstance(obj, float):
-        if not math.isfinite(obj) or math.isnan(obj):
+    if isinstance(obj, (float, np.floating)):
+        if not math.isfinite(obj):
             return None
         return obj
 
@@ -112,32 +185,45 @@ def _sanitize_for_json(obj: Any) -> Any:
     return obj
 
 
+def _fetch_cache_bucket(end_date: str) -> int:
+    """
+    Historical ranges never expire (bucket 0); ranges ending today rotate
+    every _FETCH_CACHE_TODAY_TTL seconds.
+    """
+    if end_date < datetime.now().strftime("%Y-%m-%d"):
+        return 0
+    return int(time.time() // _FETCH_CACHE_TODAY_TTL)
+
+
 # =========================
 # Core: Fetch
 # =========================
 
-def fetch_china_stock_data(stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+@lru_cache(maxsize=512)
+def _stock_zh_a_hist_cached(symbol: str, start_date: str, end_date: str, bucket: int) -> pd.DataFrame:
+    """
+    Raw AkShare call, memoized per (symbol, start, end, bucket).
+    Exceptions propagate and are therefore never cached.
+    Callers must treat the returned frame as read-only.
+    """
+    return ak.stock_zh_a_hist(
+        symbol=symbol,
+        period="daily",
+        start_date=start_date.replace("-", ""),
+        end_date=end_date.replace("-", ""),
+        adjust="qfq",
+    )
+
+
+def _fetch_akshare_bars(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
     """
-    Fetch daily A-share data via AkShare.
+    Fetch daily A-share data via AkShare (no disk cache).
 
     Returns standardized OHLCV dataframe indexed by Date:
       columns: Open, High, Low, Close, Volume
     """
-    symbol = _normalize_stock_symbol(stock_code)
-    if not symbol:
-        return pd.DataFrame()
-
-    start_date_clean = start_date.replace("-", "")
-    end_date_clean = end_date.replace("-", "")
-
     try:
-        df = ak.stock_zh_a_hist(
-            symbol=symbol,
-            period="daily",
-            start_date=start_date_clean,
-            end_date=end_date_clean,
-            adjust="qfq",
-        )
+        df = _stock_zh_a_hist_cached(symbol, start_date, end_date, _fetch_cache_bucket(end_date))
     except Exception as e:
         # Never throw to API layer
         print(f"[AkShare Error] symbol={symbol} start={start_date} end={end_date} err={e}")
@@ -146,80 +232,205 @@ def fetch_china_stock_data(stock_code: str, start_date: str, end_date: str) -> p
     if df is None or df.empty:
         return pd.DataFrame()
 
-    rename_map = {
-        "日期": "Date",
-        "开盘": "Open",
-        "最高": "High",
-        "最低": "Low",
-        "收盘": "Close",
-        "成交量": "Volume",
-    }
-
-    existing = [c for c in rename_map.keys() if c in df.columns]
+    existing = [c for c in _RENAME_MAP if c in df.columns]
     if not existing:
         print(f"[Column Error] AkShare returned columns={list(df.columns)}")
         return pd.DataFrame()
 
-    df = df[existing].rename(columns=rename_map)
+    df = df[existing].rename(columns=_RENAME_MAP)
 
-    required = {"Date", "Open", "High", "Low", "Close", "Volume"}
-    if not required.issubset(df.columns):
+    if not _REQUIRED.issubset(df.columns):
         print(f"[Column Error] missing required cols, got={list(df.columns)}")
         return pd.DataFrame()
 
+    # AkShare returns ascending, non-null dates; only pay for dropna/sort when it doesn't
     df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-    df = df.dropna(subset=["Date"]).set_index("Date").sort_index()
-
-    # Ensure numeric types
-    for col in ["Open", "High", "Low", "Close", "Volume"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+    if df["Date"].isna().any():
+        df = df.dropna(subset=["Date"])
+    df = df.set_index("Date")
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+
+    # Ensure numeric types; AkShare already returns float OHLC / int Volume,
+    # so only columns that came back as something else are coerced (in one batch)
+    to_coerce = [c for c in _NUMERIC_COLS if not pd.api.types.is_numeric_dtype(df[c])]
+    if to_coerce:
+        df[to_coerce] = df[to_coerce].apply(pd.to_numeric, errors="coerce")
 
     df = df.dropna(subset=["Close"])  # Close is essential
     return df
 
 
+def _fetch_through_bar_cache(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Serve from the Parquet bar cache, fetching only the bars after it.
+
+    Re-fetch starts at the second-to-last cached bar: the last one may be an
+    intraday (still moving) bar, and the one before is a completed bar whose
+    Close must match. A mismatch means qfq prices were re-adjusted (dividend
+    / split), so the whole range is fetched again.
+    """
+    cached, covered_from = _bar_cache.load(symbol)
+
+    if not cached.empty and covered_from and covered_from <= start_date:
+        if cached.index[-1] > pd.Timestamp(end_date):
+            return cached
+
+        anchor = cached.index[-2] if len(cached) > 1 else cached.index[-1]
+        fresh = _fetch_akshare_bars(symbol, anchor.strftime("%Y-%m-%d"), end_date)
+        if fresh.empty:
+            # AkShare down, older bars are still valid
+            return cached
+
+        if anchor in fresh.index and np.isclose(fresh.at[anchor, "Close"], cached.at[anchor, "Close"]):
+            if fresh.equals(cached[cached.index >= anchor]):
+                # no new bar and the last one didn't move, skip rewriting the file
+                return cached
+            bars = pd.concat([cached[cached.index < anchor], fresh])
+            _bar_cache.store(symbol, bars, covered_from)
+            return bars
+
+    bars = _fetch_akshare_bars(symbol, start_date, end_date)
+    if not bars.empty:
+        _bar_cache.store(symbol, bars, start_date)
+    return bars
+
+
+def fetch_china_stock_data(stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Fetch daily A-share data, via the on-disk bar cache + AkShare.
+
+    Returns standardized OHLCV dataframe indexed by Date:
+      columns: Open, High, Low, Close, Volume
+    """
+    symbol = _normalize_stock_symbol(stock_code)
+    if not symbol:
+        return pd.DataFrame()
+
+    # symbol becomes a file name in the bar cache, reject "a/b", "/tmp/x", ...
+    if not _SYMBOL_RE.fullmatch(symbol):
+        print(f"[Symbol Error] invalid A-share symbol={symbol!r}")
+        return pd.DataFrame()
+
+    with _bar_cache.lock(symbol):
+        bars = _fetch_through_bar_cache(symbol, start_date, end_date)
+
+    if bars.empty:
+        return bars
+
+    # bars is always a fresh frame; only a narrower slice needs its own copy,
+    # since feature_engineering writes columns in place
+    window = bars.loc[start_date:end_date]
+    if len(window) == len(bars):
+        return bars
+    return window.copy()
+
+
 # =========================
 # Core: Features
 # =========================
 
-def feature_engineering(df: pd.DataFrame) -> pd.DataFrame:
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Same as Series.rolling(window, min_periods=1).mean() for NaN-free x, via one cumsum.
+    Accumulates in float64: a float32 cumsum of prices loses the 4th decimal.
+    """
+    cs = np.cumsum(x, dtype=np.float64)
+    out = np.empty_like(cs)
+    k = min(window, len(x))
+    out[:k] = cs[:k] / np.arange(1, k + 1)
+    out[window:] = (cs[window:] - cs[:-window]) / window
+    return out
+
+
+def _rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Same as Series.rolling(window, min_periods=1).std(), via sliding_window_view.
+    """
+    # NaN front padding gives the first window-1 rows their partial windows
+    padded = np.concatenate([np.full(window - 1, np.nan), x])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window)
+
+    # Windows with < 2 valid values are NaN anyway; skipping them keeps nanstd
+    # from warning (suppressing via `warnings` isn't thread-safe)
+    ok = np.count_nonzero(~np.isnan(windows), axis=-1) >= 2
+    out = np.full(len(x), np.nan)
+    with np.errstate(invalid="ignore"):  # a window holding an inf return -> NaN
+        out[ok] = np.nanstd(windows[ok], axis=-1, ddof=1)
+    return out
+
+
+def _add_features_njit(out: pd.DataFrame) -> None:
+    """
+    Fused single-pass kernel (numba), see _features_njit.compute_features.
+    """
+    # float64 contiguous input -> the one specialization warmed up at import
+    close = np.ascontiguousarray(out["Close"].to_numpy(dtype=np.float64))
+
+    ma10, ma50, ret, vol20, rsi = compute_features(close)
+    out["MA_10"] = ma10
+    out["MA_50"] = ma50
+    out["Daily_Return"] = ret
+    out["Volatility_20d"] = vol20
+    out["RSI"] = rsi
+
+
+def _add_features_pandas(out: pd.DataFrame) -> None:
+    """
+    Vectorized pandas/numpy path, used when numba is not installed.
+    """
+    close = out["Close"].to_numpy(dtype=np.float64)
+
+    # Moving Averages (Close is NaN-free, see fetch)
+    out["MA_10"] = _rolling_mean(close, 10)
+    out["MA_50"] = _rolling_mean(close, 50)
+
+    # Daily returns & volatility (float64, same as the numba kernel)
+    ret = np.empty_like(close)
+    ret[0] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret[1:] = close[1:] / close[:-1] - 1.0
+    out["Daily_Return"] = ret
+    out["Volatility_20d"] = _rolling_std(out["Daily_Return"].to_numpy(), 20)
+
+    # RSI (14-day), Wilder's smoothing
+    delta = out["Close"].diff().to_numpy()
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+
+    avg_gain = pd.Series(gain, index=out.index).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean().to_numpy()
+    avg_loss = pd.Series(loss, index=out.index).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean().to_numpy()
+
+    # no losses in window -> rs = inf -> RSI 100
+    rs = np.divide(avg_gain, avg_loss, out=np.full_like(avg_gain, np.inf), where=avg_loss != 0)
+    out["RSI"] = 100 - 100 / (1 + rs)
+
+
+def feature_engineering(df: pd.DataFrame, inplace: bool = True) -> pd.DataFrame:
     """
     Add technical indicators:
       - MA_10, MA_50
       - Daily_Return
       - Volatility_20d
-      - RSI (14)
+      - RSI (14, Wilder)
+
+    inplace=True writes the columns onto df itself (no OHLCV copy); pass
+    False if the caller still needs the original frame untouched.
     """
     if df is None or df.empty:
         return pd.DataFrame()
 
-    out = df.copy()
-
-    # Moving Averages
-    out["MA_10"] = out["Close"].rolling(window=10, min_periods=1).mean()
-    out["MA_50"] = out["Close"].rolling(window=50, min_periods=1).mean()
-
-    # Daily returns & volatility
-    out["Daily_Return"] = out["Close"].pct_change()
-    out["Volatility_20d"] = out["Daily_Return"].rolling(window=20, min_periods=1).std()
-
-    # RSI (14-day), simple rolling mean
-    delta = out["Close"].diff()
-    gain = delta.clip(lower=0)
-    loss = (-delta).clip(lower=0)
-
-    avg_gain = gain.rolling(window=14, min_periods=1).mean()
-    avg_loss = loss.rolling(window=14, min_periods=1).mean()
-
-    # avoid division by zero -> NaN (handled later)
-    avg_loss = avg_loss.replace(0, np.nan)
+    out = df if inplace else df.copy()
 
-    rs = avg_gain / avg_loss
-    out["RSI"] = 100 - (100 / (1 + rs))
+    if NUMBA_AVAILABLE:
+        _add_features_njit(out)
+    else:
+        _add_features_pandas(out)
 
-    # Round float columns for readability
+    # Round float columns for readability, one np.round over the whole float block
     float_cols = out.select_dtypes(include=["float64", "float32"]).columns
-    out[float_cols] = out[float_cols].round(4)  # 4位更稳，前端可再格式化
+    if len(float_cols):
+        out[float_cols] = np.round(out[float_cols].to_numpy(dtype=np.float64), 4)  # 4位更稳，前端可再格式化
 
     return out
 
@@ -258,17 +469,22 @@ def get_stock_data_with_features(stock_code: str, interval: IntervalType = "365d
             "data": [],
         }
 
+    # fetch_china_stock_data hands back a frame we own, safe to mutate
     df = feature_engineering(df)
 
-    # Build records
-    records: List[Dict[str, Any]] = df.reset_index().to_dict(orient="records")
+    # ✅ Critical: make strict-JSON safe, NaN/Inf -> None in one vectorized pass
+    df = df.replace([np.inf, -np.inf], np.nan)
+    df = df.reset_index()
+    df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
 
-    # ✅ Critical: make strict-JSON safe
-    records = _sanitize_for_json(records)
+    # Build records: one C-level tolist() of the 2-D block, keys shared across rows
+    values = df.astype(object).where(df.notna(), None)
+    cols = values.columns.tolist()
+    records: List[Dict[str, Any]] = [dict(zip(cols, row)) for row in values.to_numpy().tolist()]
 
     return {
         "success": True,
         "message": f"Successfully retrieved stock data for {symbol}",
-        "meta": {"stock_code": stock_code, "symbol": symbol, "start_date": start_date, "end_date": end_date, "interval": interval_norm, "rows": len(records)},
+        "meta": _sanitize_for_json({"stock_code": stock_code, "symbol": symbol, "start_date": start_date, "end_date": end_date, "interval": interval_norm, "rows": len(records)}),
         "data": records,
     }